@@ -1,12 +1,15 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import argparse
+import bisect
 import datetime as dt
-import json
-from typing import Dict, List, Optional
-import urllib.parse
-import urllib.request
+import email.utils
+import hashlib
+import http.client
+import os
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+import zlib
 
 try:
     # Python 3.9+
@@ -14,6 +17,11 @@ try:
 except ImportError:
     ZoneInfo = None  # Backfall: wir behandeln Zeiten dann wie naive lokale Zeiten
 
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads  # Backfall: Standard-Parser (nimmt ebenfalls bytes)
+
 
 # ------------------------------
 # Helpers
@@ -23,21 +31,171 @@ def clamp(value: float, lo: float, hi: float) -> float:
     return max(lo, min(hi, value))
 
 
-def safe_round_to_str(x: Optional[float], ndigits: int = 1) -> str:
-    if isinstance(x, (int, float)):
-        s = f"{x:.{ndigits}f}"
-        return s.rstrip("0").rstrip(".")
-    return "NA"
+def align_columns(columns: Dict[str, List], keys: List[str], n: int) -> List[List]:
+    """
+    Bringt die Spalten keys auf genau n Einträge: zu kurze werden mit None
+    aufgefüllt, zu lange gekürzt. Danach ist jeder Index < n ohne Prüfung gültig.
+    """
+    aligned = []
+    for key in keys:
+        col = columns.get(key) or []
+        aligned.append(col[:n] if len(col) >= n else col + [None] * (n - len(col)))
+    return aligned
+
+
+def ics_datetime(d: dt.datetime) -> str:
+    """
+    Formatiert als YYYYMMDDTHHMMSS direkt aus den Feldern (schneller als strftime).
+    """
+    return f"{d.year:04d}{d.month:02d}{d.day:02d}T{d.hour:02d}{d.minute:02d}{d.second:02d}"
+
+
+def safe_round1_to_str(x: Optional[float]) -> str:
+    """
+    Eine Nachkommastelle, ".0" wird weggelassen (19.0 -> "19"); None -> "NA".
+    """
+    if x is None:
+        return "NA"
+    s = f"{x:.1f}"
+    return s[:-2] if s.endswith(".0") else s
 
 
 # ------------------------------
 # Open-Meteo Fetch
 # ------------------------------
 
-def fetch_hourly_weather(lat: float, lon: float, days: int, timezone: str) -> Dict[str, List]:
+API_HOST = "api.open-meteo.com"
+HTTP_TIMEOUT_SECONDS = 30
+CACHE_TTL_SECONDS = 15 * 60          # Forecast-Daten ändern sich nur langsam
+MAX_RESPONSE_BYTES = 5_000_000       # Schutz vor ausufernden Antworten
+
+# Keep-Alive-Verbindung, die über mehrere Abrufe im selben Prozess wiederverwendet wird
+_connection: Optional[http.client.HTTPSConnection] = None
+
+# JSON komprimiert sich etwa 5–10×; Open-Meteo liefert gzip auf Anfrage
+_REQUEST_HEADERS = {
+    "Accept-Encoding": "gzip",
+    "User-Agent": "weatherfeed-styrum",
+}
+
+
+def _gunzip(data: bytes) -> bytes:
+    """
+    Entpackt einen gzip-Body, ebenfalls begrenzt auf MAX_RESPONSE_BYTES.
+    """
+    out = zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(data, MAX_RESPONSE_BYTES + 1)
+    if len(out) > MAX_RESPONSE_BYTES:
+        raise ValueError(f"Open-Meteo response exceeds {MAX_RESPONSE_BYTES} bytes")
+    return out
+
+
+def _new_connection() -> http.client.HTTPSConnection:
+    """
+    HTTPSConnection zu API_HOST. Ist ein HTTPS-Proxy gesetzt (HTTPS_PROXY/https_proxy,
+    no_proxy wird beachtet – wie bei urlopen), geht sie per CONNECT durch den Proxy.
+    """
+    import urllib.parse
+    import urllib.request
+
+    proxy = urllib.request.getproxies().get("https")
+    if not proxy or urllib.request.proxy_bypass(API_HOST):
+        return http.client.HTTPSConnection(API_HOST, timeout=HTTP_TIMEOUT_SECONDS)
+
+    parts = urllib.parse.urlsplit(proxy if "://" in proxy else "http://" + proxy)
+    tunnel_headers = {}
+    if parts.username:
+        import base64
+        credentials = f"{urllib.parse.unquote(parts.username)}:{urllib.parse.unquote(parts.password or '')}"
+        tunnel_headers["Proxy-Authorization"] = "Basic " + base64.b64encode(credentials.encode()).decode()
+    conn = http.client.HTTPSConnection(parts.hostname, parts.port or 80, timeout=HTTP_TIMEOUT_SECONDS)
+    conn.set_tunnel(API_HOST, headers=tunnel_headers)
+    return conn
+
+
+def _http_get(
+    path: str,
+    headers: Dict[str, str],
+    conn: Optional[http.client.HTTPSConnection] = None,
+) -> Tuple[int, http.client.HTTPMessage, bytes]:
+    """
+    GET auf API_HOST über conn bzw. die modulweite Keep-Alive-Verbindung.
+    Ist die Verbindung inzwischen vom Server geschlossen worden, wird einmal
+    neu verbunden (http.client öffnet eine geschlossene Verbindung von selbst).
+    """
+    global _connection
+    if conn is None:
+        if _connection is None:
+            _connection = _new_connection()
+        conn = _connection
+    for attempt in range(2):
+        try:
+            conn.request("GET", path, headers={**_REQUEST_HEADERS, **headers})
+            response = conn.getresponse()
+            body = response.read(MAX_RESPONSE_BYTES + 1)
+        except (http.client.HTTPException, ConnectionError):
+            conn.close()
+            if attempt:
+                raise
+            continue
+        if len(body) > MAX_RESPONSE_BYTES:
+            # Rest der Antwort nicht mehr lesen; Verbindung ist damit unbrauchbar
+            conn.close()
+            raise ValueError(f"Open-Meteo response exceeds {MAX_RESPONSE_BYTES} bytes")
+        if response.getheader("Content-Encoding") == "gzip":
+            body = _gunzip(body)
+        return response.status, response.headers, body
+
+
+def _cache_path(url: str) -> str:
+    """
+    Cache-Datei je Request-URL unter $XDG_CACHE_HOME/weatherfeed (Standard ~/.cache).
+    """
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    key = hashlib.blake2b(url.encode(), digest_size=16).hexdigest()
+    return os.path.join(base, "weatherfeed", key + ".json")
+
+
+def _write_cache(path: str, raw: bytes) -> None:
+    """
+    Schreibt eine Cache-Datei atomar; Fehler werden ignoriert (Cache ist optional).
+    """
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(raw)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+def _read_validators(path: str) -> Dict[str, str]:
+    """
+    ETag/Last-Modified der gecachten Antwort (Nachbardatei .meta), sonst leer.
+    """
+    try:
+        with open(path + ".meta", "rb") as f:
+            return json_loads(f.read())
+    except (OSError, ValueError):
+        return {}
+
+
+def fetch_hourly_weather(lat: float, lon: float, days: int, timezone: str,
+                         cache_ttl: int = CACHE_TTL_SECONDS,
+                         conn: Optional[http.client.HTTPSConnection] = None) -> Tuple[Dict[str, List], str]:
     """
     Holt stündliche Wetterdaten für die Score-Berechnung und Anzeige.
+    Liefert (hourly, timezone): timezone ist die Zone, in der Open-Meteo die
+    Zeiten tatsächlich angibt (bei timezone="auto" die des Ortes).
+    Antworten werden cache_ttl Sekunden auf der Platte gecacht (0 = kein Cache);
+    danach wird per ETag/Last-Modified nachgefragt, ob sie noch aktuell sind.
+    conn: eigene HTTPSConnection zu API_HOST, z. B. für mehrere Orte
+    hintereinander; ohne Angabe wird die modulweite Verbindung genutzt.
     """
+    # erst hier importiert: wer nur build_calendar mit eigenen Daten aufruft, braucht sie nicht
+    import json
+    import urllib.parse
+
     hourly_vars = [
         "temperature_2m",
         "apparent_temperature",
@@ -47,10 +205,8 @@ def fetch_hourly_weather(lat: float, lon: float, days: int, timezone: str) -> Di
         "uv_index",
         "wind_speed_10m",
         "wind_gusts_10m",
-        "relative_humidity_2m",
         "dew_point_2m",
         "visibility",
-        "cloud_cover",
     ]
     params = {
         "latitude": lat,
@@ -61,60 +217,119 @@ def fetch_hourly_weather(lat: float, lon: float, days: int, timezone: str) -> Di
         "windspeed_unit": "kmh",   # für Wind-Scoring
         "precipitation_unit": "mm" # klar definieren
     }
-    url = "https://api.open-meteo.com/v1/forecast?" + urllib.parse.urlencode(params)
-    with urllib.request.urlopen(url) as response:
-        data = json.loads(response.read().decode())
-    return data.get("hourly", {})
+    path_query = "/v1/forecast?" + urllib.parse.urlencode(params)
+    url = f"https://{API_HOST}{path_query}"
+
+    path = _cache_path(url) if cache_ttl > 0 else None
+    try:
+        cached_at = os.path.getmtime(path) if path else None
+    except OSError:
+        cached_at = None
+
+    if cached_at is not None and time.time() - cached_at < cache_ttl:
+        with open(path, "rb") as f:
+            raw = f.read()
+    else:
+        headers = {}
+        if cached_at is not None:
+            validators = _read_validators(path)
+            if validators.get("ETag"):
+                headers["If-None-Match"] = validators["ETag"]
+            headers["If-Modified-Since"] = (validators.get("Last-Modified")
+                                            or email.utils.formatdate(cached_at, usegmt=True))
+        status, response_headers, raw = _http_get(path_query, headers, conn)
+        if status == 304 and cached_at is not None:
+            # Server hat nichts Neues -> Cache weiterverwenden und TTL erneuern
+            with open(path, "rb") as f:
+                raw = f.read()
+            try:
+                os.utime(path)
+            except OSError:
+                pass  # Cache ist optional; dann wird beim nächsten Lauf erneut nachgefragt
+        elif status == 200:
+            if path:
+                _write_cache(path, raw)
+                validators = {key: response_headers.get(key) for key in ("ETag", "Last-Modified")
+                              if response_headers.get(key)}
+                _write_cache(path + ".meta", json.dumps(validators).encode())
+        else:
+            raise http.client.HTTPException(f"Open-Meteo request failed: HTTP {status}")
+
+    # bytes direkt parsen, ohne Zwischen-str
+    data = json_loads(raw)
+    return data.get("hourly", {}), data.get("timezone") or timezone
 
 
 # ------------------------------
 # Weathercode → Icon/Description
 # ------------------------------
 
+def _expand_code_groups(groups) -> Dict[int, object]:
+    """
+    Macht aus [(Codes, Wert), ...] eine Tabelle Code -> Wert für O(1)-Lookups.
+    """
+    return {code: value for codes, value in groups for code in codes}
+
+
+_ICON_BY_CODE: Dict[int, str] = _expand_code_groups([
+    ((0,), "🌞"),                       # sonnig
+    ((1, 2, 3), "⛅"),                  # (teilweise) bewölkt
+    ((45, 48), "🌁"),                   # neblig
+    ((51, 53, 55, 56, 57), "🌧️"),       # Niesel/gefrierender Niesel
+    ((61, 63, 65, 80, 81, 82), "🌧️"),   # Regen
+    ((66, 67), "🌧️❄️"),                 # gefrierender Regen
+    ((71, 73, 75, 77, 85, 86), "🌨️"),   # Schnee
+    ((95,), "⛈️"),                      # Gewitter
+    ((96, 99), "🌩️❄️"),                 # Gewitter mit Hagel
+])
+
+_DESC_BY_CODE: Dict[int, str] = _expand_code_groups([
+    ((0,), "sonnig"),
+    ((1, 2, 3), "bewölkt"),
+    ((45, 48), "neblig"),
+    ((51, 53, 55, 56, 57), "Nieselregen"),
+    ((61, 63, 65, 80, 81, 82), "regnerisch"),
+    ((66, 67), "gefrierender Regen"),
+    ((71, 73, 75, 77, 85, 86), "schneit"),
+    ((95,), "Gewitter"),
+    ((96, 99), "Gewitter mit Hagel"),
+])
+
+# Grober Komfort/Traktion je Wettercode (siehe code_baseline_score)
+_BASELINE_BY_CODE: Dict[int, float] = _expand_code_groups([
+    ((0,), 10.0),
+    ((1, 2, 3), 9.0),
+    ((45, 48), 5.0),
+    ((51, 53, 55, 61, 80), 6.0),  # leichtes Nass
+    ((56, 57, 63, 65, 81, 82, 71, 73, 75, 77, 85, 86), 2.0),
+    ((66, 67), 0.5),
+    ((95, 96, 99), 0.0),
+])
+
+# Alles zu einem Code mit einem Lookup: (Icon, Beschreibung, Baseline-Score)
+_UNKNOWN_CODE_INFO = ("❔", "unbekannt", 5.0)
+_CODE_INFO: Dict[int, Tuple[str, str, float]] = {
+    code: (
+        _ICON_BY_CODE.get(code, _UNKNOWN_CODE_INFO[0]),
+        _DESC_BY_CODE.get(code, _UNKNOWN_CODE_INFO[1]),
+        _BASELINE_BY_CODE.get(code, _UNKNOWN_CODE_INFO[2]),
+    )
+    for code in {*_ICON_BY_CODE, *_DESC_BY_CODE, *_BASELINE_BY_CODE}
+}
+
+_FOG_CODES = frozenset({45, 48})
+_FREEZING_RAIN_CODES = frozenset({66, 67})
+_THUNDERSTORM_CODES = frozenset({95, 96, 99})
+# Gefrierender Regen & Gewitter -> Niederschlags-Score 0
+_DANGEROUS_CODES = _FREEZING_RAIN_CODES | _THUNDERSTORM_CODES
+
+
 def map_weather_code_to_icon(code: int) -> str:
-    if code == 0:
-        return "🌞"  # sonnig
-    elif code in {1, 2, 3}:
-        return "⛅"  # (teilweise) bewölkt
-    elif code in {45, 48}:
-        return "🌁"  # neblig
-    elif code in {51, 53, 55, 56, 57}:
-        return "🌧️"  # Niesel/gefrierender Niesel
-    elif code in {61, 63, 65, 80, 81, 82}:
-        return "🌧️"  # Regen
-    elif code in {66, 67}:
-        return "🌧️❄️"  # gefrierender Regen
-    elif code in {71, 73, 75, 77, 85, 86}:
-        return "🌨️"  # Schnee
-    elif code == 95:
-        return "⛈️"  # Gewitter
-    elif code in {96, 99}:
-        return "🌩️❄️"  # Gewitter mit Hagel
-    else:
-        return "❔"  # unbekannt
+    return _ICON_BY_CODE.get(code, "❔")  # ❔ = unbekannt
 
 
 def map_weather_code_to_description(code: int) -> str:
-    if code == 0:
-        return "sonnig"
-    elif code in {1, 2, 3}:
-        return "bewölkt"
-    elif code in {45, 48}:
-        return "neblig"
-    elif code in {51, 53, 55, 56, 57}:
-        return "Nieselregen"
-    elif code in {61, 63, 65, 80, 81, 82}:
-        return "regnerisch"
-    elif code in {66, 67}:
-        return "gefrierender Regen"
-    elif code in {71, 73, 75, 77, 85, 86}:
-        return "schneit"
-    elif code == 95:
-        return "Gewitter"
-    elif code in {96, 99}:
-        return "Gewitter mit Hagel"
-    else:
-        return "unbekannt"
+    return _DESC_BY_CODE.get(code, "unbekannt")
 
 
 # ------------------------------
@@ -130,8 +345,9 @@ def therm_comfort_score(apparent_temp: Optional[float]) -> float:
         return 5.0  # neutral, wenn kein Wert
     Ta = float(apparent_temp)
     # Formel: T = clamp(1 - max(0, |Ta-14| - 6) / 12, 0, 1) * 10
+    # (val ist nie > 1, daher reicht die Untergrenze)
     val = 1.0 - max(0.0, abs(Ta - 14.0) - 6.0) / 12.0
-    return clamp(val, 0.0, 1.0) * 10.0
+    return max(0.0, val) * 10.0
 
 
 def precip_score(precip_mm: Optional[float], precip_prob: Optional[float], weathercode: Optional[int]) -> float:
@@ -140,7 +356,7 @@ def precip_score(precip_mm: Optional[float], precip_prob: Optional[float], weath
     10 Punkte bei E=0, linear zu 0 bei E >= 2 mm/h.
     Gefrierender Regen & Gewitter -> harte Abwertung (0).
     """
-    if weathercode in {66, 67, 95, 96, 99}:
+    if weathercode in _DANGEROUS_CODES:
         return 0.0
     if precip_mm is None or precip_prob is None:
         # Wenn keine Angaben: neutral bis leicht vorsichtig
@@ -172,7 +388,7 @@ def wind_score(wind_speed: Optional[float], wind_gust: Optional[float]) -> float
             base = 10.0 * (1.0 - (ws - 10.0) / 30.0)
 
     if wind_gust is None:
-        return clamp(base, 0.0, 10.0)
+        return base  # bereits in [0, 10]
 
     gust = float(wind_gust)
     malus = 0.0
@@ -181,7 +397,7 @@ def wind_score(wind_speed: Optional[float], wind_gust: Optional[float]) -> float
     if wind_speed is not None and (gust - float(wind_speed)) > 20.0:
         malus += 3.0
 
-    return clamp(base - malus, 0.0, 10.0)
+    return max(0.0, base - malus)  # Malus kann nur nach unten drücken
 
 
 def uv_score(uv_index: Optional[float]) -> float:
@@ -217,9 +433,9 @@ def visibility_score(visibility_m: Optional[float], weathercode: Optional[int])
         base = 0.0
     else:
         base = 10.0 * (km - 1.0) / (8.0 - 1.0)  # linear 1→8 km
-    if weathercode in {45, 48}:
+    if weathercode in _FOG_CODES:
         base = min(base, 8.0)
-    return clamp(base, 0.0, 10.0)
+    return base
 
 
 def humidity_dewpoint_score(dew_point_c: Optional[float]) -> float:
@@ -250,22 +466,7 @@ def code_baseline_score(weathercode: Optional[int]) -> float:
     """
     if weathercode is None:
         return 6.0
-    c = int(weathercode)
-    if c == 0:
-        return 10.0
-    if c in {1, 2, 3}:
-        return 9.0
-    if c in {45, 48}:
-        return 5.0
-    if c in {51, 53, 55, 61, 80}:  # leichtes Nass
-        return 6.0
-    if c in {56, 57, 63, 65, 81, 82, 71, 73, 75, 77, 85, 86}:
-        return 2.0
-    if c in {66, 67}:
-        return 0.5
-    if c in {95, 96, 99}:
-        return 0.0
-    return 5.0
+    return _BASELINE_BY_CODE.get(int(weathercode), 5.0)
 
 
 def apply_safety_caps(score_raw: float,
@@ -278,10 +479,10 @@ def apply_safety_caps(score_raw: float,
     c = weathercode
     s = score_raw
     # Gewitter -> max 2/10
-    if c in {95, 96, 99}:
+    if c in _THUNDERSTORM_CODES:
         s = min(s, 2.0)
     # Eisglätte (sehr kalt + Niederschlag) oder gefrierender Regen -> max 2/10
-    if (temp_c is not None and precip_mm is not None and float(temp_c) <= -2.0 and float(precip_mm) > 0.0) or (c in {66, 67}):
+    if (temp_c is not None and precip_mm is not None and float(temp_c) <= -2.0 and float(precip_mm) > 0.0) or (c in _FREEZING_RAIN_CODES):
         s = min(s, 2.0)
     return s
 
@@ -345,6 +546,20 @@ def compute_sport_score(
     return int(clamp(round(score_capped), 1.0, 10.0))
 
 
+# Bewusst kein Numba/JIT und kein NumPy: jeder Cron-Lauf startet einen frischen
+# Prozess, Kompilierzeit (Hunderte ms) bzw. NumPy-Import (~100 ms) lägen weit über
+# der gesamten Score-Berechnung. Selbst der größte Feed (16 Tage × 18 Stunden =
+# 288 Stunden) braucht Stunde für Stunde nur gut 1 ms.
+
+def compute_sport_scores(rows: Dict[str, List]) -> List[int]:
+    """
+    Endscores für viele Stunden auf einmal. rows enthält je Parameter von
+    compute_sport_score eine Liste gleicher Länge (fehlende Werte als None).
+    """
+    names = list(rows)
+    return [compute_sport_score(**dict(zip(names, values))) for values in zip(*rows.values())]
+
+
 def score_to_rank_emoji(score: int) -> str:
     """
     Emoji-Mapping:
@@ -370,129 +585,147 @@ def score_to_rank_emoji(score: int) -> str:
 # Calendar Builder
 # ------------------------------
 
-def build_calendar(hourly: Dict[str, List], timezone: str, hours_ahead: int = 24) -> str:
+# "2025-01-02T15:00" -> "20250102T1500"
+_ISO_STRIP = str.maketrans("", "", "-:")
+
+# Fester Kopf/Schluss jedes Feeds, einmal beim Import kodiert (CRLF gemäß RFC 5545)
+_CAL_HEADER = "".join(line + "\r\n" for line in (
+    "BEGIN:VCALENDAR",
+    "VERSION:2.0",
+    "CALSCALE:GREGORIAN",
+    "PRODID:-//Weather Calendar//OpenMeteo//DE",
+    "REFRESH-INTERVAL;VALUE=DURATION:PT1H",
+    "X-PUBLISHED-TTL:PT1H",
+)).encode("utf-8")
+_CAL_FOOTER = b"END:VCALENDAR"
+
+
+def iter_calendar_chunks(hourly: Dict[str, List], timezone: str, hours_ahead: int = 24) -> Iterator[bytes]:
     """
-    Baut einen iCalendar-Feed mit stündlichen Events:
+    Erzeugt einen iCalendar-Feed mit stündlichen Events als UTF-8-Blöcke
+    (Kopf, je ein Block pro Event, Ende), damit er direkt in eine Datei
+    gestreamt werden kann:
     - Zeitfenster: ab jetzt bis hours_ahead
     - Bewertung/Score nur für Stunden zwischen 05:00 und 22:00 (lokal).
       Stunden außerhalb dieses Fensters werden nicht ausgegeben.
     - SUMMARY beginnt mit <Emoji><Score>/10 ...
     """
     times = hourly.get("time", [])
-    temps = hourly.get("temperature_2m", [])
-    apps = hourly.get("apparent_temperature", [])
-    codes = hourly.get("weathercode", [])
-    probs = hourly.get("precipitation_probability", [])
-    precs = hourly.get("precipitation", [])
-    uvs = hourly.get("uv_index", [])
-    winds = hourly.get("wind_speed_10m", [])
-    gusts = hourly.get("wind_gusts_10m", [])
-    hums = hourly.get("relative_humidity_2m", [])
-    dews = hourly.get("dew_point_2m", [])
-    vis = hourly.get("visibility", [])
-    clouds = hourly.get("cloud_cover", [])
-
-    # Zeitzone vorbereiten
+    # Spalten einmalig auf die Länge von "time" bringen (SoA, gleiche Indizes)
+    temps, apps, codes, probs, precs, uvs, winds, gusts, dews, vis = align_columns(hourly, [
+        "temperature_2m",
+        "apparent_temperature",
+        "weathercode",
+        "precipitation_probability",
+        "precipitation",
+        "uv_index",
+        "wind_speed_10m",
+        "wind_gusts_10m",
+        "dew_point_2m",
+        "visibility",
+    ], len(times))
+
+    # Zeitzone vorbereiten: "jetzt" in der Zone der API-Zeiten, nicht in der des Rechners
     tzinfo = ZoneInfo(timezone) if ZoneInfo is not None else None
     now_local = dt.datetime.now(tzinfo) if tzinfo else dt.datetime.now()
     cutoff = now_local + dt.timedelta(hours=hours_ahead)
 
-    cal_lines = [
-        "BEGIN:VCALENDAR",
-        "VERSION:2.0",
-        "CALSCALE:GREGORIAN",
-        "PRODID:-//Weather Calendar//OpenMeteo//DE",
-        "REFRESH-INTERVAL;VALUE=DURATION:PT1H",
-        "X-PUBLISHED-TTL:PT1H",
-    ]
-
-    for idx, iso_time in enumerate(times):
-        # Zeit parsen; Open-Meteo liefert lokale Zeit ohne Offset
+    # Open-Meteo liefert einheitlich "YYYY-MM-DDTHH:MM" -> String-Vergleich ist chronologisch.
+    # now wird dafür auf die volle Minute aufgerundet, damit "t < now" exakt erhalten bleibt.
+    start_key = (now_local + dt.timedelta(microseconds=59_999_999)).strftime("%Y-%m-%dT%H:%M")
+    end_key = cutoff.strftime("%Y-%m-%dT%H:%M")
+    # Ein komplettes Event als eine Vorlage; die festen Teile werden einmal pro Feed
+    # eingesetzt, pro Event bleibt ein einziges %-Format (dtstart für UID und DTSTART)
+    tzid = timezone.replace("%", "%%")
+    event_template = "\r\n".join((
+        "BEGIN:VEVENT",
+        "UID:%s-%d@open-meteo",
+        "DTSTAMP:" + ics_datetime(dt.datetime.now(dt.timezone.utc)) + "Z",
+        f"DTSTART;TZID={tzid}:%s",
+        f"DTEND;TZID={tzid}:%s",
+        # SUMMARY: Ranking-Emoji + numerischer Score zuerst
+        "SUMMARY:%s%d/10 %s: %s - 🌡️%s°C - ☔ %s%% / %smm - ⛱️ %s UV",
+        "END:VEVENT",
+        "",
+    ))
+
+    yield _CAL_HEADER
+
+    # 1) Stunden im Zeitfenster auswählen
+    # Filter: nur in [now, cutoff]. Die Zeiten sind aufsteigend sortiert, daher
+    # liefert eine Binärsuche auf den ISO-Strings direkt den zusammenhängenden Bereich.
+    lo = bisect.bisect_left(times, start_key)
+    hi = bisect.bisect_right(times, end_key, lo)
+    sel = []
+    for idx in range(lo, hi):
+        iso_time = times[idx]
+
+        # Bewertung nur zwischen 05:00 und 22:00 lokaler Zeit (Stunde direkt aus "...THH:MM")
         try:
-            start_dt = dt.datetime.fromisoformat(iso_time)
+            hour_local = int(iso_time[11:13])
         except ValueError:
             continue
-
-        # lokal machen
-        if tzinfo is not None and start_dt.tzinfo is None:
-            start_dt = start_dt.replace(tzinfo=tzinfo)
-
-        # Filter: nur in [now, cutoff]
-        if start_dt < now_local or start_dt > cutoff:
-            continue
-
-        # Bewertung nur zwischen 05:00 und 22:00 lokaler Zeit
-        hour_local = start_dt.hour if start_dt.tzinfo else start_dt.hour
         if hour_local < 5 or hour_local > 22:
             continue
 
-        end_dt = start_dt + dt.timedelta(hours=1)
-
-        # Werte holen (Bounds prüfen)
-        def g(arr: List, i: int) -> Optional[float]:
-            return arr[i] if i < len(arr) else None
-
-        temp = g(temps, idx)
-        app = g(apps, idx)
-        code = g(codes, idx)
-        prob = g(probs, idx)
-        prec = g(precs, idx)
-        uv = g(uvs, idx)
-        wind = g(winds, idx)
-        gust = g(gusts, idx)
-        # hum = g(hums, idx)  # aktuell nicht direkt im Score gebraucht
-        dew = g(dews, idx)
-        vis_m = g(vis, idx)
-        # cloud = g(clouds, idx)  # derzeit nicht genutzt
-
-        # Score berechnen
-        score = compute_sport_score(
-            apparent_temp=app,
-            precip_mm=prec,
-            precip_prob=prob,
-            wind_speed=wind,
-            wind_gust=gust,
-            uv_index=uv,
-            visibility_m=vis_m,
-            dew_point_c=dew,
-            weathercode=int(code) if code is not None else None,
-            air_temp=temp
-        )
+        sel.append(idx)
+
+    # 2) Scores für alle ausgewählten Stunden in einem Rutsch berechnen
+    sel_codes = [int(codes[i]) if codes[i] is not None else None for i in sel]
+    scores = compute_sport_scores({
+        "apparent_temp": [apps[i] for i in sel],
+        "precip_mm": [precs[i] for i in sel],
+        "precip_prob": [probs[i] for i in sel],
+        "wind_speed": [winds[i] for i in sel],
+        "wind_gust": [gusts[i] for i in sel],
+        "uv_index": [uvs[i] for i in sel],
+        "visibility_m": [vis[i] for i in sel],
+        "dew_point_c": [dews[i] for i in sel],
+        "weathercode": sel_codes,
+        "air_temp": [temps[i] for i in sel],
+    })
+
+    # 3) Events ausgeben
+    # Reine String-Arbeit: hier hilft weder Numba (fällt bei Strings in den langsamen
+    # Object-Mode zurück, plus Kompilierzeit pro Lauf) noch NumPy. Die Zahlenarbeit
+    # steckt oben gebündelt in compute_sport_scores.
+    for idx, code, score in zip(sel, sel_codes, scores):
+        iso_time = times[idx]
+
+        temp = temps[idx]
+        prob = probs[idx]
+        prec = precs[idx]
+        uv = uvs[idx]
+
         rank_emoji = score_to_rank_emoji(score)
 
         # Anzeigeelemente
-        icon = map_weather_code_to_icon(int(code)) if code is not None else "❔"
-        desc = map_weather_code_to_description(int(code)) if code is not None else "unbekannt"
-
-        temp_str = safe_round_to_str(temp, 1)
-        prob_str = f"{int(round(prob))}" if isinstance(prob, (int, float)) else "NA"
-        prec_str = safe_round_to_str(prec, 1)
-        uv_str = safe_round_to_str(uv, 1)
+        icon, desc, _ = _CODE_INFO.get(code, _UNKNOWN_CODE_INFO)
 
-        # SUMMARY: Ranking-Emoji + numerischer Score zuerst
-        summary = (
-            f"{rank_emoji}{score}/10 "
-            f"{icon}: {desc} - 🌡️{temp_str}°C - ☔ {prob_str}% / {prec_str}mm - ⛱️ {uv_str} UV"
-        )
+        temp_str = safe_round1_to_str(temp)
+        prob_str = f"{prob:.0f}" if prob is not None else "NA"
+        prec_str = safe_round1_to_str(prec)
+        uv_str = safe_round1_to_str(uv)
 
         # ICS-Zeiten formattieren (mit TZID)
-        dtstart = start_dt.strftime("%Y%m%dT%H%M%S")
-        dtend = end_dt.strftime("%Y%m%dT%H%M%S")
-        tzid = timezone
+        dtstart = iso_time.translate(_ISO_STRIP) + "00"
+        # Events dauern eine Stunde und beginnen spätestens 22:00 -> Ende am selben Tag,
+        # nur die Stunde in "YYYYMMDDTHHMMSS" wird um eins erhöht
+        dtend = "%s%02d%s" % (dtstart[:9], int(iso_time[11:13]) + 1, dtstart[11:])
 
-        event_lines = [
-            "BEGIN:VEVENT",
-            f"UID:{dtstart}-{idx}@open-meteo",
-            f"DTSTAMP:{dt.datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')}",
-            f"DTSTART;TZID={tzid}:{dtstart}",
-            f"DTEND;TZID={tzid}:{dtend}",
-            f"SUMMARY:{summary}",
-            "END:VEVENT",
-        ]
-        cal_lines.extend(event_lines)
+        yield (event_template % (
+            dtstart, idx, dtstart, dtend,
+            rank_emoji, score, icon, desc, temp_str, prob_str, prec_str, uv_str,
+        )).encode("utf-8")
 
-    cal_lines.append("END:VCALENDAR")
-    return "\r\n".join(cal_lines)
+    yield _CAL_FOOTER
+
+
+def build_calendar(hourly: Dict[str, List], timezone: str, hours_ahead: int = 24) -> str:
+    """
+    Der komplette Feed aus iter_calendar_chunks als ein String.
+    """
+    return b"".join(iter_calendar_chunks(hourly, timezone, hours_ahead)).decode("utf-8")
 
 
 # ------------------------------
@@ -500,23 +733,40 @@ def build_calendar(hourly: Dict[str, List], timezone: str, hours_ahead: int = 24
 # ------------------------------
 
 def main():
+    import argparse  # nur für die Kommandozeile
+
     parser = argparse.ArgumentParser(
         description="Generate an iCalendar feed with hourly weather and a sport suitability score (1–10)."
     )
     parser.add_argument("--lat", type=float, required=True, help="Latitude of the location")
     parser.add_argument("--lon", type=float, required=True, help="Longitude of the location")
-    parser.add_argument("--days", type=int, default=4, help="Number of forecast days (max 16)")
-    parser.add_argument("--timezone", type=str, default="Europe/Berlin", help="Timezone for event times (IANA name)")
+    parser.add_argument("--days", type=int, default=4,
+                        help="Upper bound for forecast days to fetch (max 16); at most as many days "
+                             "as --hours reaches from now (today + ceil(hours/24)) are requested")
+    parser.add_argument("--timezone", type=str, default="Europe/Berlin", help="Timezone for event times (IANA name or 'auto')")
     parser.add_argument("--out", type=str, default="weather.ics", help="Output .ics file path")
     parser.add_argument("--hours", type=int, default=24, help="Number of hours ahead to include (default 24)")
+    parser.add_argument("--cache-ttl", type=int, default=CACHE_TTL_SECONDS,
+                        help="Seconds to reuse a cached Open-Meteo response (0 disables the cache)")
 
     args = parser.parse_args()
 
-    hourly = fetch_hourly_weather(args.lat, args.lon, args.days, args.timezone)
-    cal_content = build_calendar(hourly, args.timezone, hours_ahead=args.hours)
-
-    with open(args.out, "w", encoding="utf-8") as f:
-        f.write(cal_content)
+    # nur so viele Tage anfragen, wie das Fenster ab jetzt berühren kann (heute + ceil(hours/24))
+    days = min(args.days, -(-args.hours // 24) + 1)
+    hourly, timezone = fetch_hourly_weather(args.lat, args.lon, days, args.timezone, cache_ttl=args.cache_ttl)
+    # Blöcke direkt in eine Nachbardatei schreiben, ohne den ganzen Feed im Speicher zu halten,
+    # und erst fertig ersetzen -> wer den Feed gerade abholt, sieht nie eine halbe Datei
+    tmp = f"{args.out}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            f.writelines(iter_calendar_chunks(hourly, timezone, hours_ahead=args.hours))
+        os.replace(tmp, args.out)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
 
     print(f"Calendar file written to {args.out}")
 
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import datetime as dt
+import http.client
+import json
+import os
+import re
+import tempfile
+import time
+import types
+import unittest
+from unittest import mock
+
+import generate_weather_calendar as gwc
+
+
+TIMEZONE = "Europe/Berlin"
+
+
+def _hourly(start: dt.datetime, hours: int) -> dict:
+    """
+    Minimale Open-Meteo-Antwort: nur "time", alle Messwerte fehlen (-> "NA").
+    """
+    return {"time": [(start + dt.timedelta(hours=i)).strftime("%Y-%m-%dT%H:%M") for i in range(hours)]}
+
+
+def _frozen_dt(now: dt.datetime) -> types.SimpleNamespace:
+    """
+    Ersatz für das Modul dt in generate_weather_calendar mit fester Uhrzeit
+    (now ist die Wanduhrzeit in der Zone des Feeds).
+    """
+    class FrozenDateTime(dt.datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return now.replace(tzinfo=tz)
+
+    return types.SimpleNamespace(datetime=FrozenDateTime, timedelta=dt.timedelta, timezone=dt.timezone)
+
+
+def _events(now: dt.datetime, hours_ahead: int) -> list:
+    """
+    (DTSTART, DTEND) aller Events, die der Feed zur Zeit now enthält.
+    """
+    hourly = _hourly(dt.datetime(2026, 7, 1), 72)
+    with mock.patch.object(gwc, "dt", _frozen_dt(now)):
+        cal = gwc.build_calendar(hourly, TIMEZONE, hours_ahead=hours_ahead)
+    return re.findall(r"DTSTART;TZID=[^:]+:(\d{8}T\d{6})\r\nDTEND;TZID=[^:]+:(\d{8}T\d{6})", cal)
+
+
+class WindowSelectionTest(unittest.TestCase):
+    def starts(self, now: dt.datetime, hours_ahead: int = 5) -> list:
+        return [start for start, _ in _events(now, hours_ahead)]
+
+    def test_exactly_on_the_hour_includes_that_hour(self):
+        self.assertEqual(self.starts(dt.datetime(2026, 7, 1, 10, 0, 0)), [
+            "20260701T100000", "20260701T110000", "20260701T120000",
+            "20260701T130000", "20260701T140000", "20260701T150000",
+        ])
+
+    def test_one_microsecond_past_the_hour_skips_that_hour(self):
+        self.assertEqual(self.starts(dt.datetime(2026, 7, 1, 10, 0, 0, 1)), [
+            "20260701T110000", "20260701T120000", "20260701T130000",
+            "20260701T140000", "20260701T150000",
+        ])
+
+    def test_just_before_the_hour_stops_before_cutoff(self):
+        # cutoff 14:59:59 -> 15:00 liegt schon dahinter
+        self.assertEqual(self.starts(dt.datetime(2026, 7, 1, 9, 59, 59)), [
+            "20260701T100000", "20260701T110000", "20260701T120000",
+            "20260701T130000", "20260701T140000",
+        ])
+
+    def test_hours_ahead_bounds_the_window(self):
+        self.assertEqual(self.starts(dt.datetime(2026, 7, 1, 10, 0, 0), hours_ahead=0), ["20260701T100000"])
+        # cutoff ist inklusiv: 10:00–22:00 heute plus 05:00–10:00 morgen
+        starts = self.starts(dt.datetime(2026, 7, 1, 10, 0, 0), hours_ahead=24)
+        self.assertEqual((starts[0], starts[-1], len(starts)), ("20260701T100000", "20260702T100000", 19))
+
+    def test_last_event_of_the_day_ends_at_23(self):
+        # 23:00 und 00:00 liegen außerhalb 05:00–22:00 und fehlen
+        self.assertEqual(_events(dt.datetime(2026, 7, 1, 20, 0, 0), 5), [
+            ("20260701T200000", "20260701T210000"),
+            ("20260701T210000", "20260701T220000"),
+            ("20260701T220000", "20260701T230000"),
+        ])
+
+
+_PAYLOAD = json.dumps({"timezone": TIMEZONE, "hourly": {"time": ["2026-07-01T10:00"]}}).encode()
+
+
+class _StubResponse:
+    def __init__(self, status: int, headers: dict, body: bytes):
+        self.status = status
+        self.headers = headers
+        self._body = body
+
+    def read(self, amt=None):
+        return self._body
+
+    def getheader(self, name, default=None):
+        return self.headers.get(name, default)
+
+
+class _StubConnection:
+    """
+    Spielt vorgegebene (status, headers, body) ab und merkt sich die Request-Header.
+    """
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def request(self, method, path, headers=None):
+        self.requests.append(headers or {})
+
+    def getresponse(self):
+        return _StubResponse(*self.responses.pop(0))
+
+    def close(self):
+        pass
+
+
+class FetchCacheTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        env = mock.patch.dict(os.environ, {"XDG_CACHE_HOME": tmp.name})
+        env.start()
+        self.addCleanup(env.stop)
+        self.cache_dir = os.path.join(tmp.name, "weatherfeed")
+
+    def fetch(self, conn):
+        return gwc.fetch_hourly_weather(51.45, 6.86, 2, TIMEZONE, conn=conn)
+
+    def cache_file(self) -> str:
+        (name,) = [n for n in os.listdir(self.cache_dir) if n.endswith(".json")]
+        return os.path.join(self.cache_dir, name)
+
+    def fetch_and_expire(self) -> str:
+        self.fetch(_StubConnection((200, {"ETag": 'W/"v1"', "Last-Modified": "Wed, 01 Jul 2026 08:00:00 GMT"}, _PAYLOAD)))
+        path = self.cache_file()
+        old = time.time() - gwc.CACHE_TTL_SECONDS - 60
+        os.utime(path, (old, old))
+        return path
+
+    def test_fresh_200_writes_cache_and_validators(self):
+        conn = _StubConnection((200, {"ETag": 'W/"v1"', "Last-Modified": "Wed, 01 Jul 2026 08:00:00 GMT"}, _PAYLOAD))
+        self.assertEqual(self.fetch(conn), ({"time": ["2026-07-01T10:00"]}, TIMEZONE))
+        self.assertNotIn("If-None-Match", conn.requests[0])
+        self.assertNotIn("If-Modified-Since", conn.requests[0])
+        path = self.cache_file()
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), _PAYLOAD)
+        with open(path + ".meta", "rb") as f:
+            self.assertEqual(json.loads(f.read()),
+                             {"ETag": 'W/"v1"', "Last-Modified": "Wed, 01 Jul 2026 08:00:00 GMT"})
+
+    def test_within_ttl_makes_no_request(self):
+        self.fetch(_StubConnection((200, {}, _PAYLOAD)))
+        conn = _StubConnection()
+        self.assertEqual(self.fetch(conn), ({"time": ["2026-07-01T10:00"]}, TIMEZONE))
+        self.assertEqual(conn.requests, [])
+
+    def test_expired_304_reuses_cache_and_renews_ttl(self):
+        path = self.fetch_and_expire()
+        conn = _StubConnection((304, {}, b""))
+        self.assertEqual(self.fetch(conn), ({"time": ["2026-07-01T10:00"]}, TIMEZONE))
+        self.assertEqual(conn.requests[0]["If-None-Match"], 'W/"v1"')
+        self.assertEqual(conn.requests[0]["If-Modified-Since"], "Wed, 01 Jul 2026 08:00:00 GMT")
+        self.assertLess(time.time() - os.path.getmtime(path), gwc.CACHE_TTL_SECONDS)
+
+    def test_304_survives_read_only_cache(self):
+        self.fetch_and_expire()
+        with mock.patch.object(gwc.os, "utime", side_effect=PermissionError):
+            result = self.fetch(_StubConnection((304, {}, b"")))
+        self.assertEqual(result, ({"time": ["2026-07-01T10:00"]}, TIMEZONE))
+
+    def test_error_status_raises_and_caches_nothing(self):
+        with self.assertRaises(http.client.HTTPException):
+            self.fetch(_StubConnection((500, {}, b"")))
+        self.assertFalse(os.path.exists(self.cache_dir))
+
+    def test_expired_cache_with_error_status_raises(self):
+        self.fetch_and_expire()
+        with self.assertRaises(http.client.HTTPException):
+            self.fetch(_StubConnection((500, {}, b"")))
+
+
+if __name__ == "__main__":
+    unittest.main()